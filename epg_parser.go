@@ -1,30 +1,41 @@
 package main
 
 import (
+	"bufio"
+	"bytes"
 	"compress/gzip"
+	"crypto/tls"
 	"encoding/json"
 	"encoding/xml"
+	"errors"
 	"fmt"
+	"io"
+	"net"
 	"net/http"
 	"os"
 	"path/filepath"
-	"regexp"
 	"sort"
 	"strings"
+	"sync"
 	"time"
+	"unicode"
 )
 
-// XML structures
+// TV holds one parsed feed. Programmes are grouped by channel ID as they are
+// read rather than collected into one flat list and regrouped afterwards.
 type TV struct {
-	XMLName    xml.Name    `xml:"tv"`
-	Channels   []Channel   `xml:"channel"`
-	Programmes []Programme `xml:"programme"`
+	Channels            []Channel
+	ProgrammesByChannel map[string][]ScheduleEntry
+	ProgrammeCount      int
+	KeptProgrammes      int
 }
 
+// XML structures
 type Channel struct {
 	ID          string `xml:"id,attr"`
 	DisplayName string `xml:"display-name"`
 	Icon        Icon   `xml:"icon"`
+	Key         string `xml:"-"` // normalizeChannelName(DisplayName), set while parsing
 }
 
 type Programme struct {
@@ -32,7 +43,6 @@ type Programme struct {
 	Stop    string `xml:"stop,attr"`
 	Channel string `xml:"channel,attr"`
 	Title   string `xml:"title"`
-	Desc    string `xml:"desc"`
 	Icon    Icon   `xml:"icon"`
 }
 
@@ -40,6 +50,18 @@ type Icon struct {
 	Src string `xml:"src,attr"`
 }
 
+// ScheduleEntry is the compact form a Programme is kept in after parsing:
+// only the fields written to the JSON, with times as Unix seconds so that
+// sorting and day-window checks are plain integer compares. They are only
+// turned back into IST clock times when the JSON is written.
+// The raw timestamp and channel strings are dropped once decoded.
+type ScheduleEntry struct {
+	Title string
+	Logo  string
+	Start int64
+	Stop  int64
+}
+
 // JSON structures
 type ChannelJSON struct {
 	ChannelName string        `json:"channel_name"`
@@ -58,6 +80,58 @@ type ProgramJSON struct {
 type FilterRule struct {
 	OriginalName string
 	OutputName   string
+	Filename     string // formatFilename(OutputName), computed once at load
+	Key          string // normalizeChannelName(OriginalName), computed once at load
+}
+
+type ChannelIndex struct {
+	Source     string
+	ByName     map[string]*Channel
+	Names      []string
+	Programmes map[string][]ScheduleEntry
+}
+
+// ChannelLookup resolves filter rules against every source. Exact names
+// from all sources are merged into one map up front, higher-priority
+// sources first, so an exact match is a single lookup; partial matching
+// still walks the sources in priority order.
+type ChannelLookup struct {
+	Exact   map[string]ChannelMatch
+	Indexes []*ChannelIndex
+}
+
+type ChannelMatch struct {
+	Channel    *Channel
+	Programmes []ScheduleEntry
+	Source     string
+}
+
+// ParseFilter narrows what the parser keeps: programmes for channels some
+// filter rule can select, within the today-tomorrow window (Unix seconds)
+type ParseFilter struct {
+	RuleKeys    []string
+	WindowStart int64
+	WindowEnd   int64
+}
+
+type EPGDownload struct {
+	Name      string
+	URL       string
+	CacheFile string // last downloaded copy, revalidated with a conditional GET
+	TV        *TV
+	Err       error
+	Attempts  int
+	Duration  time.Duration
+	FromCache bool // the server answered 304 and the cached copy was parsed
+}
+
+type HTTPStatusError struct {
+	StatusCode int
+	Status     string
+}
+
+func (e *HTTPStatusError) Error() string {
+	return "unexpected HTTP status: " + e.Status
 }
 
 type LogEntry struct {
@@ -68,6 +142,44 @@ type LogEntry struct {
 	Status          string
 }
 
+// India Standard Time is a fixed UTC+05:30 with no DST, so a fixed zone gives
+// the same result as Asia/Kolkata without needing tzdata on the runner or a
+// zone-transition lookup on every conversion
+var istLocation = time.FixedZone("IST", 5*60*60+30*60)
+
+// EPG downloads are retried on transient failures, waiting a little longer
+// before each new attempt
+const downloadAttempts = 3
+const downloadRetryDelay = 5 * time.Second
+
+// Read buffer used between the HTTP body and the gzip decompressor
+const downloadBufferSize = 256 * 1024
+
+// The body is decompressed and parsed while it streams in, so the timeout
+// covers the whole download rather than just the response headers. The
+// client shares one pooled transport so the concurrent downloads (and the
+// redirects behind the short links) reuse connections and TLS sessions.
+var httpClient = &http.Client{
+	Timeout:   5 * time.Minute,
+	Transport: newHTTPTransport(),
+}
+
+func newHTTPTransport() *http.Transport {
+	transport := http.DefaultTransport.(*http.Transport).Clone()
+	transport.MaxIdleConns = 16
+	transport.MaxIdleConnsPerHost = 8
+	transport.TLSClientConfig = &tls.Config{ClientSessionCache: tls.NewLRUClientSessionCache(16)}
+	// The feeds are .gz files that are decompressed by the parser itself.
+	// Without this the transport would negotiate gzip transfer encoding and
+	// could hand an already-inflated stream to gzip.NewReader.
+	transport.DisableCompression = true
+	return transport
+}
+
+// epgCacheDir keeps the last copy of each feed between runs so unchanged
+// feeds can be revalidated instead of downloaded; the workflow caches it
+const epgCacheDir = ".epg-cache"
+
 var logEntries []LogEntry
 var logBuffer strings.Builder
 
@@ -80,13 +192,7 @@ func main() {
 	logMessage("🚀 Starting EPG Parser...")
 	logMessage(fmt.Sprintf("🕒 Script started at: %s", time.Now().Format("2006-01-02 15:04:05 MST")))
 
-	// Load IST timezone
-	ist, err := time.LoadLocation("Asia/Kolkata")
-	if err != nil {
-		logMessage(fmt.Sprintf("❌ Error loading IST timezone: %v", err))
-		saveLog()
-		return
-	}
+	ist := istLocation
 
 	// Get today and tomorrow in IST
 	now := time.Now().In(ist)
@@ -96,78 +202,102 @@ func main() {
 	logMessage(fmt.Sprintf("📅 Today (IST): %s", today.Format("2006-01-02")))
 	logMessage(fmt.Sprintf("📅 Tomorrow (IST): %s", tomorrow.Format("2006-01-02")))
 
-	// Download and parse EPG files
-	logMessage("\n📥 Downloading Jio TV EPG...")
-	jioTV, err := downloadAndParseEPG("https://avkb.short.gy/jioepg.xml.gz")
+	// Load filter rules before downloading anything
+	logMessage("\n📋 Loading filter.txt...")
+	filterRules, err := loadFilterRules("filter.txt")
 	if err != nil {
-		logMessage(fmt.Sprintf("❌ Error downloading Jio TV EPG: %v", err))
+		logMessage(fmt.Sprintf("❌ Error loading filter.txt: %v", err))
 		saveLog()
 		return
 	}
-	logMessage(fmt.Sprintf("✅ Jio TV: %d channels, %d programmes", len(jioTV.Channels), len(jioTV.Programmes)))
+	logMessage(fmt.Sprintf("✅ Loaded %d filter rules", len(filterRules)))
 
-	logMessage("\n📥 Downloading Tata Play EPG...")
-	tataTV, err := downloadAndParseEPG("https://avkb.short.gy/tsepg.xml.gz")
-	if err != nil {
-		logMessage(fmt.Sprintf("❌ Error downloading Tata Play EPG: %v", err))
+	// Nothing to generate, so don't spend the run downloading both feeds,
+	// but still clear out the schedules written for the old rules
+	if len(filterRules) == 0 {
+		logMessage("⚠️  No filter rules found, skipping EPG download")
+		for _, dir := range []string{"output-today", "output-tomorrow"} {
+			removed, err := removeStaleOutputs(dir, nil)
+			if err != nil && !os.IsNotExist(err) {
+				logMessage(fmt.Sprintf("❌ Error cleaning %s: %v", dir, err))
+				continue
+			}
+			logMessage(fmt.Sprintf("🗑️  Removed %d stale files from %s", removed, dir))
+		}
+		// Rewrite the detailed log too, so it no longer lists the old channels
 		saveLog()
+		saveDetailedLog()
 		return
 	}
-	logMessage(fmt.Sprintf("✅ Tata Play: %d channels, %d programmes", len(tataTV.Channels), len(tataTV.Programmes)))
 
-	// Create channel maps by ID and by normalized name
-	logMessage("\n🔀 Building channel index...")
-	jioChannelsByID := make(map[string]*Channel)
-	jioChannelsByName := make(map[string]*Channel)
-	for i := range jioTV.Channels {
-		ch := &jioTV.Channels[i]
-		jioChannelsByID[ch.ID] = ch
-		jioChannelsByName[normalizeChannelName(ch.DisplayName)] = ch
+	// Print all filter rules
+	logMessage("\n📝 Filter Rules:")
+	for i, rule := range filterRules {
+		logMessage(fmt.Sprintf("   %d. %s → %s", i+1, rule.OriginalName, rule.OutputName))
 	}
 
-	tataChannelsByID := make(map[string]*Channel)
-	tataChannelsByName := make(map[string]*Channel)
-	for i := range tataTV.Channels {
-		ch := &tataTV.Channels[i]
-		tataChannelsByID[ch.ID] = ch
-		tataChannelsByName[normalizeChannelName(ch.DisplayName)] = ch
+	// Download and parse both EPG files concurrently; they are independent
+	// and the run is dominated by network time
+	logMessage("\n📥 Downloading Jio TV and Tata Play EPGs...")
+	downloads := []EPGDownload{
+		{Name: "Jio TV", URL: "https://avkb.short.gy/jioepg.xml.gz", CacheFile: filepath.Join(epgCacheDir, "jioepg.xml.gz")},
+		{Name: "Tata Play", URL: "https://avkb.short.gy/tsepg.xml.gz", CacheFile: filepath.Join(epgCacheDir, "tsepg.xml.gz")},
 	}
-
-	// Build programme maps by channel ID
-	logMessage("🔀 Building programme index...")
-	jioProgrammesByChannel := make(map[string][]Programme)
-	for _, prog := range jioTV.Programmes {
-		jioProgrammesByChannel[prog.Channel] = append(jioProgrammesByChannel[prog.Channel], prog)
+	if err := os.MkdirAll(epgCacheDir, 0755); err != nil {
+		logMessage(fmt.Sprintf("⚠️  Warning: EPG cache unavailable, downloading in full: %v", err))
 	}
-
-	tataProgrammesByChannel := make(map[string][]Programme)
-	for _, prog := range tataTV.Programmes {
-		tataProgrammesByChannel[prog.Channel] = append(tataProgrammesByChannel[prog.Channel], prog)
+	filter := ParseFilter{
+		RuleKeys:    make([]string, len(filterRules)),
+		WindowStart: today.Unix(),
+		WindowEnd:   tomorrow.AddDate(0, 0, 1).Unix(),
 	}
+	for i, rule := range filterRules {
+		filter.RuleKeys[i] = rule.Key
+	}
+	downloadAllEPGs(downloads, filter)
 
-	logMessage(fmt.Sprintf("✅ Indexed %d Jio channels and %d Tata channels", len(jioChannelsByName), len(tataChannelsByName)))
-
-	// Load filter rules
-	logMessage("\n📋 Loading filter.txt...")
-	filterRules, err := loadFilterRules("filter.txt")
-	if err != nil {
-		logMessage(fmt.Sprintf("❌ Error loading filter.txt: %v", err))
+	failed := false
+	for _, dl := range downloads {
+		if dl.Err != nil {
+			logMessage(fmt.Sprintf("❌ Error downloading %s EPG after %d attempt(s): %v", dl.Name, dl.Attempts, dl.Err))
+			failed = true
+			continue
+		}
+		origin := "downloaded"
+		if dl.FromCache {
+			origin = "not modified, cached copy"
+		}
+		logMessage(fmt.Sprintf("✅ %s: %d channels, %d programmes, %d kept for today/tomorrow (%s, %s, %d attempt(s))",
+			dl.Name, len(dl.TV.Channels), dl.TV.ProgrammeCount, dl.TV.KeptProgrammes, origin, dl.Duration.Round(time.Millisecond), dl.Attempts))
+	}
+	if failed {
 		saveLog()
 		return
 	}
-	logMessage(fmt.Sprintf("✅ Loaded %d filter rules", len(filterRules)))
-
-	// Print all filter rules
-	logMessage("\n📝 Filter Rules:")
-	for i, rule := range filterRules {
-		logMessage(fmt.Sprintf("   %d. %s → %s", i+1, rule.OriginalName, rule.OutputName))
+	jioTV := downloads[0].TV
+	tataTV := downloads[1].TV
+
+	// Index channels by normalized name and programmes by channel ID
+	logMessage("\n🔀 Building channel and programme index...")
+	jioIndex := buildChannelIndex("Jio", jioTV)
+	tataIndex := buildChannelIndex("Tata", tataTV)
+
+	lookup := newChannelLookup(jioIndex, tataIndex)
+
+	logMessage(fmt.Sprintf("✅ Indexed %d Jio channels and %d Tata channels", len(jioIndex.ByName), len(tataIndex.ByName)))
+
+	// Create output directories. Existing files are kept so unchanged
+	// schedules are not rewritten; anything not produced by this run is
+	// removed once all channels have been processed.
+	outputDirs := []string{"output-today", "output-tomorrow"}
+	for _, dir := range outputDirs {
+		if err := os.MkdirAll(dir, 0755); err != nil {
+			logMessage(fmt.Sprintf("❌ Error creating %s: %v", dir, err))
+			saveLog()
+			return
+		}
 	}
-
-	// Create output directories
-	os.RemoveAll("output-today")
-	os.RemoveAll("output-tomorrow")
-	os.MkdirAll("output-today", 0755)
-	os.MkdirAll("output-tomorrow", 0755)
+	produced := make(map[string]bool)
 
 	// Process channels
 	logMessage("\n⚙️  Processing channels...")
@@ -187,27 +317,7 @@ func main() {
 		}
 
 		// Try to find channel in Jio first, then Tata
-		normalizedSearch := normalizeChannelName(rule.OriginalName)
-		
-		var channel *Channel
-		var programmes []Programme
-		var source string
-
-		// Check Jio first
-		if ch, exists := jioChannelsByName[normalizedSearch]; exists {
-			channel = ch
-			programmes = jioProgrammesByChannel[ch.ID]
-			source = "Jio"
-		} else if ch, exists := tataChannelsByName[normalizedSearch]; exists {
-			channel = ch
-			programmes = tataProgrammesByChannel[ch.ID]
-			source = "Tata"
-		} else {
-			// Try fuzzy matching
-			channel, programmes, source = fuzzyFindChannel(rule.OriginalName, 
-				jioChannelsByName, tataChannelsByName,
-				jioProgrammesByChannel, tataProgrammesByChannel)
-		}
+		channel, programmes, source := lookup.findChannel(rule.Key)
 
 		if channel == nil {
 			logMessage(fmt.Sprintf("❌ Channel not found: %s", rule.OriginalName))
@@ -218,36 +328,24 @@ func main() {
 		}
 
 		logMessage(fmt.Sprintf("\n✅ Found: %s (from %s, ID: %s)", channel.DisplayName, source, channel.ID))
-		logMessage(fmt.Sprintf("   Total programmes: %d", len(programmes)))
+		logMessage(fmt.Sprintf("   Programmes in window: %d", len(programmes)))
 
-		// Filter and save today's schedule
-		todayProgs := filterProgrammesByDateRange(programmes, today, ist)
+		// Split into today's and tomorrow's schedules in one pass
+		todayProgs, tomorrowProgs := bucketTodayTomorrow(programmes, today)
+
+		// Save today's and tomorrow's schedules
 		logMessage(fmt.Sprintf("   Today's programmes: %d", len(todayProgs)))
 		logEntry.TodayPrograms = len(todayProgs)
-
-		if len(todayProgs) > 0 {
-			err := saveChannelJSON(channel, todayProgs, today, rule.OutputName, "output-today", ist)
-			if err == nil {
-				savedToday++
-				logMessage(fmt.Sprintf("   ✅ Saved: output-today/%s", formatFilename(rule.OutputName)))
-			} else {
-				logMessage(fmt.Sprintf("   ❌ Error saving today: %v", err))
-			}
+		if saveDaySchedule(channel, todayProgs, today, rule.Filename, "output-today", "today") {
+			savedToday++
+			produced[filepath.Join("output-today", rule.Filename)] = true
 		}
 
-		// Filter and save tomorrow's schedule
-		tomorrowProgs := filterProgrammesByDateRange(programmes, tomorrow, ist)
 		logMessage(fmt.Sprintf("   Tomorrow's programmes: %d", len(tomorrowProgs)))
 		logEntry.TomorrowPrograms = len(tomorrowProgs)
-
-		if len(tomorrowProgs) > 0 {
-			err := saveChannelJSON(channel, tomorrowProgs, tomorrow, rule.OutputName, "output-tomorrow", ist)
-			if err == nil {
-				savedTomorrow++
-				logMessage(fmt.Sprintf("   ✅ Saved: output-tomorrow/%s", formatFilename(rule.OutputName)))
-			} else {
-				logMessage(fmt.Sprintf("   ❌ Error saving tomorrow: %v", err))
-			}
+		if saveDaySchedule(channel, tomorrowProgs, tomorrow, rule.Filename, "output-tomorrow", "tomorrow") {
+			savedTomorrow++
+			produced[filepath.Join("output-tomorrow", rule.Filename)] = true
 		}
 
 		if len(todayProgs) == 0 && len(tomorrowProgs) == 0 {
@@ -260,12 +358,24 @@ func main() {
 		logEntries = append(logEntries, logEntry)
 	}
 
+	// Drop schedules left over from earlier runs for channels that produced
+	// nothing this time
+	removed := 0
+	for _, dir := range outputDirs {
+		n, err := removeStaleOutputs(dir, produced)
+		removed += n
+		if err != nil {
+			logMessage(fmt.Sprintf("❌ Error removing stale files from %s: %v", dir, err))
+		}
+	}
+
 	logMessage("\n" + strings.Repeat("=", 80))
 	logMessage("\n📊 Final Summary:")
 	logMessage(fmt.Sprintf("   Total Processed: %d channels", processed))
 	logMessage(fmt.Sprintf("   ✅ Saved Today: %d", savedToday))
 	logMessage(fmt.Sprintf("   ✅ Saved Tomorrow: %d", savedTomorrow))
 	logMessage(fmt.Sprintf("   ❌ Skipped: %d", skipped))
+	logMessage(fmt.Sprintf("   🗑️  Removed stale files: %d", removed))
 	logMessage(fmt.Sprintf("\n🕒 Script completed at: %s", time.Now().Format("2006-01-02 15:04:05 MST")))
 
 	// Save detailed log
@@ -274,65 +384,396 @@ func main() {
 	logMessage("\n✅ Done! Check epg-parser.log for details.")
 }
 
-func downloadAndParseEPG(url string) (*TV, error) {
-	resp, err := http.Get(url)
+// downloadAllEPGs fetches every source in its own goroutine and records the
+// result, error and elapsed time on each entry. Transient failures are
+// retried a bounded number of times with a growing delay.
+func downloadAllEPGs(downloads []EPGDownload, filter ParseFilter) {
+	var wg sync.WaitGroup
+	for i := range downloads {
+		wg.Add(1)
+		go func(dl *EPGDownload) {
+			defer wg.Done()
+			started := time.Now()
+			for dl.Attempts = 1; ; dl.Attempts++ {
+				dl.TV, dl.FromCache, dl.Err = downloadAndParseEPG(dl.URL, dl.CacheFile, filter)
+				if dl.Err == nil || dl.Attempts >= downloadAttempts || !isRetryableDownloadError(dl.Err) {
+					break
+				}
+				time.Sleep(time.Duration(dl.Attempts) * downloadRetryDelay)
+			}
+			dl.Duration = time.Since(started)
+		}(&downloads[i])
+	}
+	wg.Wait()
+}
+
+// isRetryableDownloadError reports whether another attempt could succeed.
+// Only network errors, server errors (5xx) and truncated streams are
+// retried; anything else, such as a 4xx or a body that is not gzip or not
+// valid XML, would fail the same way again.
+func isRetryableDownloadError(err error) bool {
+	var statusErr *HTTPStatusError
+	if errors.As(err, &statusErr) {
+		return statusErr.StatusCode >= 500
+	}
+	var netErr net.Error
+	return errors.As(err, &netErr) || errors.Is(err, io.ErrUnexpectedEOF)
+}
+
+// downloadAndParseEPG fetches a feed with a conditional GET against the
+// cached copy's ETag/Last-Modified. A 304 parses the cached copy instead of
+// downloading the feed again; a 200 is written to the cache as it streams
+// through the parser and replaces the old copy only once it parsed cleanly.
+// The cache is best effort: if it cannot be written the feed is still parsed.
+func downloadAndParseEPG(url, cacheFile string, filter ParseFilter) (*TV, bool, error) {
+	tv, fromCache, err := fetchEPG(url, cacheFile, filter, true)
+	if err != nil && fromCache {
+		// The cached copy is unreadable or corrupt, and revalidating it would
+		// only get another 304, so drop it and fetch the feed in full
+		os.Remove(cacheFile)
+		os.Remove(cacheFile + ".validators")
+		return fetchEPG(url, cacheFile, filter, false)
+	}
+	return tv, fromCache, err
+}
+
+// fetchEPG makes one request for a feed, conditional on the cached copy when
+// conditional is set. It reports whether the cached copy was used, also when
+// reading it failed.
+func fetchEPG(url, cacheFile string, filter ParseFilter, conditional bool) (*TV, bool, error) {
+	req, err := http.NewRequest(http.MethodGet, url, nil)
 	if err != nil {
-		return nil, err
+		return nil, false, err
+	}
+	// Only ask for a 304 when there is a cached copy to fall back on
+	if _, err := os.Stat(cacheFile); conditional && err == nil {
+		etag, lastModified := readCacheValidators(cacheFile)
+		if etag != "" {
+			req.Header.Set("If-None-Match", etag)
+		}
+		if lastModified != "" {
+			req.Header.Set("If-Modified-Since", lastModified)
+		}
+	}
+
+	resp, err := httpClient.Do(req)
+	if err != nil {
+		return nil, false, err
 	}
 	defer resp.Body.Close()
 
-	gzReader, err := gzip.NewReader(resp.Body)
+	if resp.StatusCode == http.StatusNotModified {
+		cached, err := os.Open(cacheFile)
+		if err != nil {
+			return nil, true, err
+		}
+		defer cached.Close()
+		tv, err := parseEPGGzip(cached, filter)
+		return tv, true, err
+	}
+
+	// Fail before handing an error page to the gzip reader
+	if resp.StatusCode != http.StatusOK {
+		return nil, false, &HTTPStatusError{StatusCode: resp.StatusCode, Status: resp.Status}
+	}
+
+	var body io.Reader = resp.Body
+	var cache *cacheWriter
+	tmp, err := os.CreateTemp(filepath.Dir(cacheFile), filepath.Base(cacheFile)+".*.tmp")
+	if err == nil {
+		defer os.Remove(tmp.Name()) // no-op once renamed into place
+		defer tmp.Close()
+		cache = &cacheWriter{file: tmp}
+		body = io.TeeReader(resp.Body, cache)
+	}
+
+	tv, err := parseEPGGzip(body, filter)
+	if err != nil {
+		return nil, false, err
+	}
+
+	if cache != nil {
+		// Drain anything the parser did not need so the cached copy is complete
+		if _, err := io.Copy(io.Discard, body); err == nil && cache.err == nil && tmp.Close() == nil &&
+			os.Rename(tmp.Name(), cacheFile) == nil {
+			writeCacheValidators(cacheFile, resp.Header.Get("ETag"), resp.Header.Get("Last-Modified"))
+		}
+	}
+
+	return tv, false, nil
+}
+
+// cacheWriter copies a feed into the cache file without ever failing the
+// read it is teed from: after the first write error it stops writing and
+// the copy is discarded instead of being renamed into place
+type cacheWriter struct {
+	file *os.File
+	err  error
+}
+
+func (w *cacheWriter) Write(p []byte) (int, error) {
+	if w.err == nil {
+		_, w.err = w.file.Write(p)
+	}
+	return len(p), nil
+}
+
+func parseEPGGzip(r io.Reader, filter ParseFilter) (*TV, error) {
+	// Large read buffer keeps the inflater fed without a syscall per 4KB chunk
+	gzReader, err := gzip.NewReader(bufio.NewReaderSize(r, downloadBufferSize))
 	if err != nil {
 		return nil, err
 	}
 	defer gzReader.Close()
 
-	var tv TV
-	decoder := xml.NewDecoder(gzReader)
-	err = decoder.Decode(&tv)
+	return parseEPGStream(xml.NewDecoder(gzReader), filter)
+}
+
+// readCacheValidators returns the ETag and Last-Modified stored next to a
+// cached feed; missing or unreadable metadata just means no conditional GET
+func readCacheValidators(cacheFile string) (string, string) {
+	data, err := os.ReadFile(cacheFile + ".validators")
 	if err != nil {
-		return nil, err
+		return "", ""
+	}
+	etag, lastModified, _ := strings.Cut(string(data), "\n")
+	return strings.TrimSpace(etag), strings.TrimSpace(lastModified)
+}
+
+func writeCacheValidators(cacheFile, etag, lastModified string) {
+	os.WriteFile(cacheFile+".validators", []byte(etag+"\n"+lastModified+"\n"), 0644)
+}
+
+// parseEPGStream walks the XMLTV document token by token and only decodes
+// <channel> and <programme> elements; every other top-level element is
+// skipped without being materialised. Programme times are parsed here,
+// once per record; programmes with unparseable times are dropped.
+//
+// Programmes belonging to a known channel that none of the filter rules can
+// resolve to are skipped without decoding, and programmes entirely outside
+// the today-tomorrow window are dropped once their times are parsed. Feeds
+// cover several days, so only a fraction of each one is kept in memory.
+func parseEPGStream(decoder *xml.Decoder, filter ParseFilter) (*TV, error) {
+	tv := TV{ProgrammesByChannel: make(map[string][]ScheduleEntry)}
+	inRoot := false
+
+	// XMLTV lists channels before programmes, so the wanted set is worked out
+	// when the first programme arrives. It is recomputed if another channel
+	// shows up later, and programmes for channels not seen yet are kept.
+	seenChannels := make(map[string]bool)
+	var wanted map[string]bool
+
+	// Repeats and shared show artwork mean the same title and logo strings
+	// arrive many times; keeping one copy of each lets the rest be collected
+	strs := make(stringPool)
+
+	for {
+		tok, err := decoder.Token()
+		if err == io.EOF {
+			break
+		}
+		if err != nil {
+			return nil, err
+		}
+
+		start, ok := tok.(xml.StartElement)
+		if !ok {
+			continue
+		}
+		if !inRoot {
+			inRoot = true
+			continue
+		}
+
+		switch start.Name.Local {
+		case "channel":
+			var ch Channel
+			if err := decoder.DecodeElement(&ch, &start); err != nil {
+				return nil, err
+			}
+			ch.Key = normalizeChannelName(ch.DisplayName)
+			tv.Channels = append(tv.Channels, ch)
+			seenChannels[ch.ID] = true
+			wanted = nil
+		case "programme":
+			tv.ProgrammeCount++
+			if wanted == nil {
+				wanted = wantedChannelIDs(tv.Channels, filter.RuleKeys)
+			}
+			channelID := attrValue(start, "channel")
+			if seenChannels[channelID] && !wanted[channelID] {
+				if err := decoder.Skip(); err != nil {
+					return nil, err
+				}
+				continue
+			}
+
+			var prog Programme
+			if err := decoder.DecodeElement(&prog, &start); err != nil {
+				return nil, err
+			}
+			var entry ScheduleEntry
+			if entry.Start, err = parseEPGTime(prog.Start); err != nil {
+				continue
+			}
+			if entry.Stop, err = parseEPGTime(prog.Stop); err != nil {
+				continue
+			}
+			if entry.Start >= filter.WindowEnd || (entry.Start < filter.WindowStart && entry.Stop <= filter.WindowStart) {
+				continue
+			}
+			// Interned only once kept, so dropped programmes add nothing to the pool
+			entry.Title = strs.intern(prog.Title)
+			entry.Logo = strs.intern(prog.Icon.Src)
+			tv.ProgrammesByChannel[prog.Channel] = append(tv.ProgrammesByChannel[prog.Channel], entry)
+			tv.KeptProgrammes++
+		default:
+			if err := decoder.Skip(); err != nil {
+				return nil, err
+			}
+		}
 	}
 
 	return &tv, nil
 }
 
+// stringPool hands back one shared copy of equal strings
+type stringPool map[string]string
+
+func (pool stringPool) intern(s string) string {
+	if shared, ok := pool[s]; ok {
+		return shared
+	}
+	pool[s] = s
+	return s
+}
+
+func attrValue(start xml.StartElement, name string) string {
+	for _, attr := range start.Attr {
+		if attr.Name.Local == name {
+			return attr.Value
+		}
+	}
+	return ""
+}
+
+// wantedChannelIDs returns the IDs of every channel in one source that a
+// filter rule could resolve to: its exact match there or, failing that, its
+// first partial match. This is a superset of what findChannel will pick
+// once the sources are combined.
+func wantedChannelIDs(channels []Channel, ruleKeys []string) map[string]bool {
+	index := newChannelIndex("", channels, nil)
+	wanted := make(map[string]bool, len(ruleKeys))
+	for _, key := range ruleKeys {
+		if ch, exists := index.ByName[key]; exists {
+			wanted[ch.ID] = true
+		} else if ch := index.fuzzyFind(key); ch != nil {
+			wanted[ch.ID] = true
+		}
+	}
+	return wanted
+}
+
+// buildChannelIndex indexes one source's channels by normalized display name
+// alongside its programmes by channel ID
+func buildChannelIndex(source string, tv *TV) *ChannelIndex {
+	return newChannelIndex(source, tv.Channels, tv.ProgrammesByChannel)
+}
+
+// newChannelIndex builds the name map and the sorted name list. The list is
+// built once so partial matching scans a slice in a stable order instead of
+// ranging over the map for every unmatched filter rule.
+func newChannelIndex(source string, channels []Channel, programmes map[string][]ScheduleEntry) *ChannelIndex {
+	index := &ChannelIndex{
+		Source:     source,
+		ByName:     make(map[string]*Channel, len(channels)),
+		Programmes: programmes,
+	}
+
+	for i := range channels {
+		ch := &channels[i]
+		index.ByName[ch.Key] = ch
+	}
+
+	index.Names = make([]string, 0, len(index.ByName))
+	for name := range index.ByName {
+		index.Names = append(index.Names, name)
+	}
+	sort.Strings(index.Names)
+
+	return index
+}
+
 func normalizeChannelName(name string) string {
 	// Remove .json extension
 	name = strings.TrimSuffix(name, ".json")
 	
-	// Convert to lowercase
-	name = strings.ToLower(name)
-	
-	// Remove all spaces, dashes, and special characters
-	reg := regexp.MustCompile(`[^a-z0-9]`)
-	name = reg.ReplaceAllString(name, "")
-	
-	return name
+	// Lowercase and drop everything but a-z0-9 in one pass over the bytes.
+	// Non-ASCII names go through strings.ToLower first, since a few Unicode
+	// letters (e.g. the Kelvin sign) lowercase to ASCII.
+	for i := 0; i < len(name); i++ {
+		if name[i] >= 0x80 {
+			name = strings.ToLower(name)
+			break
+		}
+	}
+
+	buf := make([]byte, 0, len(name))
+	for i := 0; i < len(name); i++ {
+		c := name[i]
+		switch {
+		case c >= 'a' && c <= 'z', c >= '0' && c <= '9':
+			buf = append(buf, c)
+		case c >= 'A' && c <= 'Z':
+			buf = append(buf, c+('a'-'A'))
+		}
+	}
+
+	return string(buf)
 }
 
-func fuzzyFindChannel(searchName string, jioChannels, tataChannels map[string]*Channel,
-	jioProgrammes, tataProgrammes map[string][]Programme) (*Channel, []Programme, string) {
-	
-	normalized := normalizeChannelName(searchName)
-	
-	// Try partial matching in Jio
-	for key, ch := range jioChannels {
-		if strings.Contains(key, normalized) || strings.Contains(normalized, key) {
-			return ch, jioProgrammes[ch.ID], "Jio"
+// newChannelLookup builds the merged exact-name map from indexes given in
+// priority order; a name already claimed by an earlier source is kept
+func newChannelLookup(indexes ...*ChannelIndex) *ChannelLookup {
+	lookup := &ChannelLookup{Exact: make(map[string]ChannelMatch), Indexes: indexes}
+	for _, index := range indexes {
+		for name, ch := range index.ByName {
+			if _, exists := lookup.Exact[name]; !exists {
+				lookup.Exact[name] = ChannelMatch{Channel: ch, Programmes: index.Programmes[ch.ID], Source: index.Source}
+			}
 		}
 	}
-	
-	// Try partial matching in Tata
-	for key, ch := range tataChannels {
-		if strings.Contains(key, normalized) || strings.Contains(normalized, key) {
-			return ch, tataProgrammes[ch.ID], "Tata"
+	return lookup
+}
+
+// findChannel resolves a normalized channel name in priority order: an
+// exact match in any source wins over a partial match
+func (lookup *ChannelLookup) findChannel(normalized string) (*Channel, []ScheduleEntry, string) {
+	if match, exists := lookup.Exact[normalized]; exists {
+		return match.Channel, match.Programmes, match.Source
+	}
+
+	// Try fuzzy matching
+	for _, index := range lookup.Indexes {
+		if ch := index.fuzzyFind(normalized); ch != nil {
+			return ch, index.Programmes[ch.ID], index.Source
 		}
 	}
-	
+
 	return nil, nil, ""
 }
 
+// fuzzyFind returns the first channel, in sorted name order, whose
+// normalized name contains or is contained in the search name
+func (index *ChannelIndex) fuzzyFind(normalized string) *Channel {
+	for _, key := range index.Names {
+		if strings.Contains(key, normalized) || strings.Contains(normalized, key) {
+			return index.ByName[key]
+		}
+	}
+	return nil
+}
+
 func loadFilterRules(filename string) ([]FilterRule, error) {
 	data, err := os.ReadFile(filename)
 	if err != nil {
@@ -341,6 +782,7 @@ func loadFilterRules(filename string) ([]FilterRule, error) {
 
 	lines := strings.Split(string(data), "\n")
 	rules := make([]FilterRule, 0)
+	seen := make(map[FilterRule]bool)
 
 	for _, line := range lines {
 		line = strings.TrimSpace(line)
@@ -357,6 +799,14 @@ func loadFilterRules(filename string) ([]FilterRule, error) {
 			rule.OriginalName = line
 			rule.OutputName = line
 		}
+		rule.Filename = formatFilename(rule.OutputName)
+		rule.Key = normalizeChannelName(rule.OriginalName)
+
+		// A repeated rule would look up, bucket and write the same file again
+		if seen[rule] {
+			continue
+		}
+		seen[rule] = true
 
 		rules = append(rules, rule)
 	}
@@ -364,69 +814,183 @@ func loadFilterRules(filename string) ([]FilterRule, error) {
 	return rules, nil
 }
 
-func filterProgrammesByDateRange(programmes []Programme, targetDate time.Time, loc *time.Location) []Programme {
-	result := make([]Programme, 0)
-	startOfDay := targetDate
-	endOfDay := targetDate.AddDate(0, 0, 1).Add(-time.Nanosecond)
+// bucketTodayTomorrow returns today's and tomorrow's schedules for a
+// channel. A programme is included in a day if it overlaps it at all, so
+// shows running across midnight land in both. The channel's programmes are
+// sorted in place (feeds are normally already chronological, so this is
+// usually just a check) and each day is then located by binary search and
+// normally returned as a sub-slice, without copying.
+func bucketTodayTomorrow(programmes []ScheduleEntry, today time.Time) ([]ScheduleEntry, []ScheduleEntry) {
+	tomorrow := today.AddDate(0, 0, 1)
+	dayAfter := tomorrow.AddDate(0, 0, 1)
 
-	for _, prog := range programmes {
-		startTime, err := parseEPGTime(prog.Start, loc)
-		if err != nil {
-			continue
-		}
+	sortByStartTime(programmes)
 
-		// Include programme if it starts within the target day OR if it's ongoing during the day
-		endTime, err := parseEPGTime(prog.Stop, loc)
-		if err != nil {
-			continue
-		}
+	return programmesOverlapping(programmes, today.Unix(), tomorrow.Unix()),
+		programmesOverlapping(programmes, tomorrow.Unix(), dayAfter.Unix())
+}
+
+// programmesOverlapping finds the programmes of a start-sorted slice that
+// start before dayEnd AND end after dayStart
+func programmesOverlapping(programmes []ScheduleEntry, dayStart, dayEnd int64) []ScheduleEntry {
+	// First programme starting at or after the end of the day
+	hi := sort.Search(len(programmes), func(i int) bool {
+		return programmes[i].Start >= dayEnd
+	})
 
-		// Programme overlaps with target day if:
-		// - It starts before end of day AND ends after start of day
-		if startTime.Before(endOfDay) && endTime.After(startOfDay) {
-			result = append(result, prog)
+	// First programme starting within the day
+	lo := sort.Search(hi, func(i int) bool {
+		return programmes[i].Start >= dayStart
+	})
+
+	// Programmes that started earlier but are still running when the day
+	// begins. A long programme can be followed by shorter ones that have
+	// already ended, so the whole head is checked rather than stopping at
+	// the first programme that ended before dayStart.
+	first, running := lo, 0
+	for i := 0; i < lo; i++ {
+		if programmes[i].Stop > dayStart {
+			if running == 0 {
+				first = i
+			}
+			running++
 		}
 	}
 
-	// Sort by start time
-	sort.Slice(result, func(i, j int) bool {
-		t1, _ := parseEPGTime(result[i].Start, loc)
-		t2, _ := parseEPGTime(result[j].Start, loc)
-		return t1.Before(t2)
-	})
+	if running == 0 && lo == hi {
+		return nil
+	}
+	// The usual case: the running programmes sit right before the day
+	if lo-first == running {
+		return programmes[first:hi:hi]
+	}
 
-	return result
+	window := make([]ScheduleEntry, 0, running+hi-lo)
+	for _, prog := range programmes[:lo] {
+		if prog.Stop > dayStart {
+			window = append(window, prog)
+		}
+	}
+	return append(window, programmes[lo:hi]...)
 }
 
-func parseEPGTime(timeStr string, loc *time.Location) (time.Time, error) {
+func sortByStartTime(programmes []ScheduleEntry) {
+	less := func(i, j int) bool { return programmes[i].Start < programmes[j].Start }
+	if !sort.SliceIsSorted(programmes, less) {
+		sort.Slice(programmes, less)
+	}
+}
+
+// parseEPGTime returns an XMLTV timestamp as Unix seconds
+func parseEPGTime(timeStr string) (int64, error) {
 	// Format: "20251102183000 +0000" or "20251102183000"
-	parts := strings.Fields(timeStr)
-	if len(parts) == 0 {
-		return time.Time{}, fmt.Errorf("invalid time format")
+	timeStr = strings.TrimSpace(timeStr)
+	if len(timeStr) < 14 {
+		return 0, fmt.Errorf("timestamp too short")
+	}
+	rest := timeStr[14:]
+	zone := strings.TrimLeftFunc(rest, unicode.IsSpace)
+	if zone != "" && len(zone) == len(rest) {
+		return 0, fmt.Errorf("invalid time format: %q", timeStr)
 	}
 
-	// Parse the timestamp part (first 14 characters: YYYYMMDDHHmmss)
-	timestamp := parts[0]
-	if len(timestamp) < 14 {
-		return time.Time{}, fmt.Errorf("timestamp too short")
+	// Slice the fixed-width YYYYMMDDHHmmss digits directly instead of going
+	// through time.Parse's layout matching for every programme
+	year, ok1 := atoiDigits(timeStr[0:4])
+	month, ok2 := atoiDigits(timeStr[4:6])
+	day, ok3 := atoiDigits(timeStr[6:8])
+	hour, ok4 := atoiDigits(timeStr[8:10])
+	minute, ok5 := atoiDigits(timeStr[10:12])
+	second, ok6 := atoiDigits(timeStr[12:14])
+	if !(ok1 && ok2 && ok3 && ok4 && ok5 && ok6) ||
+		month < 1 || month > 12 || day < 1 || day > 31 ||
+		hour > 23 || minute > 59 || second > 59 {
+		return 0, fmt.Errorf("invalid time format: %q", timeStr)
 	}
 
-	t, err := time.Parse("20060102150405", timestamp)
-	if err != nil {
-		return time.Time{}, err
+	t := time.Date(year, time.Month(month), day, hour, minute, second, 0, time.UTC)
+	// time.Date normalizes impossible dates such as 30 February; reject them
+	if t.Day() != day {
+		return 0, fmt.Errorf("invalid date: %q", timeStr)
+	}
+
+	// Apply an optional ±HHMM offset arithmetically; building a
+	// time.FixedZone per programme just to convert it back is wasted work.
+	// Named zones ("UTC", "GMT", ...) and anything after the zone are
+	// ignored and the time read as UTC, as before offsets were honored.
+	if end := strings.IndexFunc(zone, unicode.IsSpace); end >= 0 {
+		zone = zone[:end]
+	}
+	if zone != "" && (zone[0] == '+' || zone[0] == '-') {
+		offset, ok := parseUTCOffset(zone)
+		if !ok {
+			return 0, fmt.Errorf("invalid time zone offset: %q", timeStr)
+		}
+		t = t.Add(-offset)
 	}
 
-	// Convert from UTC to IST
-	return t.UTC().In(loc), nil
+	return t.Unix(), nil
 }
 
-func formatTime12Hour(t time.Time) string {
-	hour := t.Hour()
-	minute := t.Minute()
-	period := "AM"
-	
+// parseUTCOffset parses an XMLTV "+HHMM"/"-HHMM" zone offset
+func parseUTCOffset(zone string) (time.Duration, bool) {
+	if len(zone) != 5 || (zone[0] != '+' && zone[0] != '-') {
+		return 0, false
+	}
+	hours, ok1 := atoiDigits(zone[1:3])
+	minutes, ok2 := atoiDigits(zone[3:5])
+	if !ok1 || !ok2 || minutes > 59 {
+		return 0, false
+	}
+	offset := time.Duration(hours)*time.Hour + time.Duration(minutes)*time.Minute
+	if zone[0] == '-' {
+		offset = -offset
+	}
+	return offset, true
+}
+
+// atoiDigits parses a short run of ASCII digits without allocating
+func atoiDigits(s string) (int, bool) {
+	n := 0
+	for i := 0; i < len(s); i++ {
+		c := s[i]
+		if c < '0' || c > '9' {
+			return 0, false
+		}
+		n = n*10 + int(c-'0')
+	}
+	return n, true
+}
+
+// clockLabels holds the "hh:mm AM" label for every minute of the day, so
+// formatting a programme time is a table lookup instead of a new string
+var clockLabels = buildClockLabels()
+
+func buildClockLabels() *[24 * 60]string {
+	var labels [24 * 60]string
+	for hour := 0; hour < 24; hour++ {
+		for minute := 0; minute < 60; minute++ {
+			labels[hour*60+minute] = clockLabel(hour, minute)
+		}
+	}
+	return &labels
+}
+
+// formatTime12Hour formats Unix seconds as a clock time at the given zone
+// offset (seconds east of UTC)
+func formatTime12Hour(unix int64, offset int) string {
+	seconds := (unix + int64(offset)) % (24 * 60 * 60)
+	if seconds < 0 {
+		seconds += 24 * 60 * 60
+	}
+	return clockLabels[seconds/60]
+}
+
+func clockLabel(hour, minute int) string {
+	period := byte('A')
+
 	if hour >= 12 {
-		period = "PM"
+		period = 'P'
 		if hour > 12 {
 			hour -= 12
 		}
@@ -434,8 +998,14 @@ func formatTime12Hour(t time.Time) string {
 	if hour == 0 {
 		hour = 12
 	}
-	
-	return fmt.Sprintf("%02d:%02d %s", hour, minute, period)
+
+	// "hh:mm AM" is fixed width, so build it directly rather than via Sprintf
+	buf := [8]byte{
+		byte('0' + hour/10), byte('0' + hour%10), ':',
+		byte('0' + minute/10), byte('0' + minute%10), ' ',
+		period, 'M',
+	}
+	return string(buf[:])
 }
 
 func formatFilename(name string) string {
@@ -447,9 +1017,33 @@ func formatFilename(name string) string {
 	return filename
 }
 
-func saveChannelJSON(channel *Channel, programmes []Programme, date time.Time, outputName string, dir string, loc *time.Location) error {
+// saveDaySchedule writes one day's schedule for a channel and logs the
+// outcome. It reports whether a file was written.
+func saveDaySchedule(channel *Channel, programmes []ScheduleEntry, date time.Time, filename string, dir string, day string) bool {
 	if len(programmes) == 0 {
-		return nil
+		return false
+	}
+
+	written, err := saveChannelJSON(channel, programmes, date, filename, dir)
+	if err != nil {
+		logMessage(fmt.Sprintf("   ❌ Error saving %s: %v", day, err))
+		return false
+	}
+
+	if written {
+		logMessage(fmt.Sprintf("   ✅ Saved: %s/%s", dir, filename))
+	} else {
+		logMessage(fmt.Sprintf("   ✅ Unchanged: %s/%s", dir, filename))
+	}
+	return true
+}
+
+// saveChannelJSON writes one day's schedule and reports whether the file was
+// actually written. When the existing file already holds identical bytes it
+// is left untouched, which keeps its mtime and the git diff clean.
+func saveChannelJSON(channel *Channel, programmes []ScheduleEntry, date time.Time, filename string, dir string) (bool, error) {
+	if len(programmes) == 0 {
+		return false, nil
 	}
 
 	// Prepare JSON structure
@@ -457,39 +1051,109 @@ func saveChannelJSON(channel *Channel, programmes []Programme, date time.Time, o
 		ChannelName: channel.DisplayName,
 		ChannelLogo: channel.Icon.Src,
 		Date:        date.Format("2006-01-02"),
-		Programs:    make([]ProgramJSON, 0),
+		Programs:    make([]ProgramJSON, 0, len(programmes)),
 	}
 
+	// Clock times are shown in the zone the day was computed in. IST is a
+	// fixed offset, so one lookup covers every programme.
+	_, offset := date.Zone()
 	for _, prog := range programmes {
-		startTime, err := parseEPGTime(prog.Start, loc)
-		if err != nil {
-			continue
-		}
-		endTime, err := parseEPGTime(prog.Stop, loc)
-		if err != nil {
-			continue
-		}
-
 		programJSON := ProgramJSON{
 			ShowName:  prog.Title,
-			StartTime: formatTime12Hour(startTime),
-			EndTime:   formatTime12Hour(endTime),
-			ShowLogo:  prog.Icon.Src,
+			StartTime: formatTime12Hour(prog.Start, offset),
+			EndTime:   formatTime12Hour(prog.Stop, offset),
+			ShowLogo:  prog.Logo,
 		}
 		channelJSON.Programs = append(channelJSON.Programs, programJSON)
 	}
 
-	// Generate filename
-	filename := formatFilename(outputName)
+	var buf bytes.Buffer
+	encoder := json.NewEncoder(&buf)
+	encoder.SetIndent("", "  ")
+	if err := encoder.Encode(channelJSON); err != nil {
+		return false, err
+	}
 
-	// Write JSON file
+	// Skip the write when the schedule has not changed since the last run
 	filePath := filepath.Join(dir, filename)
-	jsonData, err := json.MarshalIndent(channelJSON, "", "  ")
+	if fileHasContent(filePath, buf.Bytes()) {
+		return false, nil
+	}
+
+	return true, writeFileAtomic(filePath, buf.Bytes())
+}
+
+// writeFileAtomic writes data to a temp file in the same directory and
+// renames it over path, so a reader (or a commit made while a run is cut
+// short) never sees a half-written schedule
+func writeFileAtomic(path string, data []byte) error {
+	tmp, err := os.CreateTemp(filepath.Dir(path), filepath.Base(path)+".*.tmp")
 	if err != nil {
 		return err
 	}
+	defer os.Remove(tmp.Name()) // no-op once renamed into place
+
+	if _, err := tmp.Write(data); err != nil {
+		tmp.Close()
+		return err
+	}
+	if err := tmp.Close(); err != nil {
+		return err
+	}
+	// CreateTemp opens with 0600; keep the mode os.WriteFile used
+	if err := os.Chmod(tmp.Name(), 0644); err != nil {
+		return err
+	}
+	return os.Rename(tmp.Name(), path)
+}
+
+// fileHasContent reports whether the file at path holds exactly content.
+// The size is checked before anything is read.
+func fileHasContent(path string, content []byte) bool {
+	file, err := os.Open(path)
+	if err != nil {
+		return false
+	}
+	defer file.Close()
+
+	info, err := file.Stat()
+	if err != nil || info.Size() != int64(len(content)) {
+		return false
+	}
+
+	existing := make([]byte, len(content))
+	if _, err := io.ReadFull(file, existing); err != nil {
+		return false
+	}
+	return bytes.Equal(existing, content)
+}
+
+// removeStaleOutputs deletes JSON files in dir that were not produced by
+// this run and returns how many were removed
+func removeStaleOutputs(dir string, produced map[string]bool) (int, error) {
+	entries, err := os.ReadDir(dir)
+	if err != nil {
+		return 0, err
+	}
+
+	removed := 0
+	for _, entry := range entries {
+		// Leftover temp files from an interrupted write are stale too
+		name := entry.Name()
+		if entry.IsDir() || !(strings.HasSuffix(name, ".json") || strings.HasSuffix(name, ".tmp")) {
+			continue
+		}
+		path := filepath.Join(dir, name)
+		if produced[path] {
+			continue
+		}
+		if err := os.Remove(path); err != nil {
+			return removed, err
+		}
+		removed++
+	}
 
-	return os.WriteFile(filePath, jsonData, 0644)
+	return removed, nil
 }
 
 func saveLog() {
@@ -0,0 +1,254 @@
+package main
+
+import (
+	"bytes"
+	"compress/gzip"
+	"encoding/xml"
+	"errors"
+	"fmt"
+	"io"
+	"net"
+	"net/http"
+	"net/http/httptest"
+	"os"
+	"path/filepath"
+	"testing"
+	"time"
+)
+
+func TestBucketTodayTomorrowKeepsLongProgrammeAcrossMidnight(t *testing.T) {
+	today := time.Date(2025, 11, 2, 0, 0, 0, 0, istLocation)
+	at := func(hour, minute int) int64 {
+		return today.Add(time.Duration(hour)*time.Hour + time.Duration(minute)*time.Minute).Unix()
+	}
+
+	// The 22:00-02:00 film is followed by a shorter programme that ends
+	// before midnight, so the two running programmes are not adjacent
+	programmes := []ScheduleEntry{
+		{Title: "Film", Start: at(22, 0), Stop: at(26, 0)},
+		{Title: "Short", Start: at(23, 0), Stop: at(23, 30)},
+		{Title: "Late News", Start: at(23, 30), Stop: at(24, 30)},
+		{Title: "Morning", Start: at(30, 0), Stop: at(31, 0)},
+	}
+
+	todayProgs, tomorrowProgs := bucketTodayTomorrow(programmes, today)
+
+	if got := titles(todayProgs); !equalStrings(got, []string{"Film", "Short", "Late News"}) {
+		t.Errorf("today = %v", got)
+	}
+	if got := titles(tomorrowProgs); !equalStrings(got, []string{"Film", "Late News", "Morning"}) {
+		t.Errorf("tomorrow = %v", got)
+	}
+}
+
+func titles(programmes []ScheduleEntry) []string {
+	out := make([]string, len(programmes))
+	for i, prog := range programmes {
+		out[i] = prog.Title
+	}
+	return out
+}
+
+func equalStrings(a, b []string) bool {
+	if len(a) != len(b) {
+		return false
+	}
+	for i := range a {
+		if a[i] != b[i] {
+			return false
+		}
+	}
+	return true
+}
+
+func TestParseEPGTime(t *testing.T) {
+	want := time.Date(2025, 11, 2, 18, 30, 0, 0, time.UTC).Unix()
+	for _, input := range []string{
+		"20251102183000",
+		"20251102183000 +0000",
+		"\t20251102183000\t+0000\n",
+		"20251103000000 +0530",
+		"20251102183000 UTC",
+		"20251102183000 GMT",
+		"20251102183000 BST",
+		"20251102183000 +0000 extra",
+		"20251102183000\t+0000\tUTC",
+	} {
+		got, err := parseEPGTime(input)
+		if err != nil || got != want {
+			t.Errorf("parseEPGTime(%q) = %d, %v; want %d", input, got, err, want)
+		}
+	}
+
+	for _, input := range []string{
+		"20250230120000 +0000",
+		"20251102183000+0000",
+		"2025110218300",
+		"20251102246000",
+		"20251102183000 +05:30",
+	} {
+		if _, err := parseEPGTime(input); err == nil {
+			t.Errorf("parseEPGTime(%q) succeeded, want an error", input)
+		}
+	}
+}
+
+func TestIsRetryableDownloadError(t *testing.T) {
+	cases := []struct {
+		err  error
+		want bool
+	}{
+		{&HTTPStatusError{StatusCode: 503}, true},
+		{&HTTPStatusError{StatusCode: 404}, false},
+		{&net.OpError{Op: "dial", Err: errors.New("connection refused")}, true},
+		{fmt.Errorf("reading feed: %w", io.ErrUnexpectedEOF), true},
+		{gzip.ErrHeader, false},
+		{&xml.SyntaxError{Msg: "unexpected EOF", Line: 1}, false},
+	}
+	for _, c := range cases {
+		if got := isRetryableDownloadError(c.err); got != c.want {
+			t.Errorf("isRetryableDownloadError(%v) = %v, want %v", c.err, got, c.want)
+		}
+	}
+}
+
+const testFeed = `<?xml version="1.0" encoding="UTF-8"?>
+<tv>
+  <channel id="c1"><display-name>Test TV</display-name></channel>
+  <programme start="20251102183000 +0000" stop="20251102190000 +0000" channel="c1"><title>News</title></programme>
+</tv>`
+
+var testFilter = ParseFilter{RuleKeys: []string{"testtv"}, WindowStart: 0, WindowEnd: 1 << 62}
+
+func gzipBytes(t *testing.T, data string) []byte {
+	t.Helper()
+	var buf bytes.Buffer
+	gz := gzip.NewWriter(&buf)
+	if _, err := gz.Write([]byte(data)); err != nil {
+		t.Fatal(err)
+	}
+	if err := gz.Close(); err != nil {
+		t.Fatal(err)
+	}
+	return buf.Bytes()
+}
+
+// feedServer serves body with an ETag and answers 304 to any request that
+// revalidates; it records whether each request was conditional
+func feedServer(t *testing.T, body []byte, conditional *[]bool) *httptest.Server {
+	t.Helper()
+	server := httptest.NewServer(http.HandlerFunc(func(w http.ResponseWriter, r *http.Request) {
+		revalidating := r.Header.Get("If-None-Match") != ""
+		*conditional = append(*conditional, revalidating)
+		if revalidating {
+			w.WriteHeader(http.StatusNotModified)
+			return
+		}
+		w.Header().Set("ETag", `"v1"`)
+		w.Write(body)
+	}))
+	t.Cleanup(server.Close)
+	return server
+}
+
+func writeCache(t *testing.T, cacheFile string, data []byte) {
+	t.Helper()
+	if err := os.WriteFile(cacheFile, data, 0644); err != nil {
+		t.Fatal(err)
+	}
+	writeCacheValidators(cacheFile, `"v1"`, "")
+}
+
+func checkFeed(t *testing.T, tv *TV) {
+	t.Helper()
+	if len(tv.Channels) != 1 || len(tv.ProgrammesByChannel["c1"]) != 1 {
+		t.Fatalf("parsed %d channels, %d programmes; want 1 and 1", len(tv.Channels), len(tv.ProgrammesByChannel["c1"]))
+	}
+}
+
+func TestDownloadNotModifiedParsesCachedCopy(t *testing.T) {
+	var conditional []bool
+	server := feedServer(t, gzipBytes(t, "not served"), &conditional)
+	cacheFile := filepath.Join(t.TempDir(), "feed.xml.gz")
+	writeCache(t, cacheFile, gzipBytes(t, testFeed))
+
+	tv, fromCache, err := downloadAndParseEPG(server.URL, cacheFile, testFilter)
+	if err != nil || !fromCache {
+		t.Fatalf("fromCache = %v, err = %v; want cached copy", fromCache, err)
+	}
+	checkFeed(t, tv)
+	if len(conditional) != 1 || !conditional[0] {
+		t.Errorf("requests (conditional) = %v, want one revalidation", conditional)
+	}
+}
+
+func TestDownloadNotModifiedWithCorruptCacheRefetches(t *testing.T) {
+	var conditional []bool
+	body := gzipBytes(t, testFeed)
+	server := feedServer(t, body, &conditional)
+	cacheFile := filepath.Join(t.TempDir(), "feed.xml.gz")
+	writeCache(t, cacheFile, []byte("corrupt"))
+
+	tv, fromCache, err := downloadAndParseEPG(server.URL, cacheFile, testFilter)
+	if err != nil || fromCache {
+		t.Fatalf("fromCache = %v, err = %v; want a full download", fromCache, err)
+	}
+	checkFeed(t, tv)
+	if len(conditional) != 2 || !conditional[0] || conditional[1] {
+		t.Errorf("requests (conditional) = %v, want a revalidation then a full fetch", conditional)
+	}
+	if cached, _ := os.ReadFile(cacheFile); !bytes.Equal(cached, body) {
+		t.Error("corrupt cache was not replaced by the downloaded feed")
+	}
+}
+
+func TestDownloadSucceedsWhenCacheCannotBeWritten(t *testing.T) {
+	var conditional []bool
+	server := feedServer(t, gzipBytes(t, testFeed), &conditional)
+
+	// The cache directory does not exist, so no temp file can be created
+	cacheFile := filepath.Join(t.TempDir(), "missing", "feed.xml.gz")
+	tv, _, err := downloadAndParseEPG(server.URL, cacheFile, testFilter)
+	if err != nil {
+		t.Fatalf("download failed: %v", err)
+	}
+	checkFeed(t, tv)
+
+	// A write that fails part way through must not surface as a read error
+	tmp, err := os.CreateTemp(t.TempDir(), "cache")
+	if err != nil {
+		t.Fatal(err)
+	}
+	tmp.Close()
+	cache := &cacheWriter{file: tmp}
+	tv, err = parseEPGGzip(io.TeeReader(bytes.NewReader(gzipBytes(t, testFeed)), cache), testFilter)
+	if err != nil {
+		t.Fatalf("parse through failing cache writer: %v", err)
+	}
+	checkFeed(t, tv)
+	if cache.err == nil {
+		t.Error("cacheWriter did not record the write error")
+	}
+}
+
+func TestDownloadWithBadBodyKeepsCache(t *testing.T) {
+	var conditional []bool
+	server := feedServer(t, gzipBytes(t, "<tv><channel"), &conditional)
+	dir := t.TempDir()
+	cacheFile := filepath.Join(dir, "feed.xml.gz")
+	good := gzipBytes(t, testFeed)
+	// No validators, so the request is unconditional and gets the bad body
+	if err := os.WriteFile(cacheFile, good, 0644); err != nil {
+		t.Fatal(err)
+	}
+
+	if _, _, err := downloadAndParseEPG(server.URL, cacheFile, testFilter); err == nil {
+		t.Fatal("expected a parse error")
+	}
+	if cached, _ := os.ReadFile(cacheFile); !bytes.Equal(cached, good) {
+		t.Error("cached feed was replaced by a body that failed to parse")
+	}
+	if entries, _ := os.ReadDir(dir); len(entries) != 1 {
+		t.Errorf("cache dir has %d entries, want only the cached feed", len(entries))
+	}
+}
@@ -0,0 +1,53 @@
+import os
+import unittest
+from unittest import mock
+
+# The importer reads its configuration at import time
+os.environ.setdefault('WP_BASE_URL', 'https://wp.example')
+os.environ.setdefault('WP_USER', 'user')
+os.environ.setdefault('WP_APP_PASSWORD', 'password')
+
+import wp_acf_importer as importer
+
+
+def response(status_code, body):
+    r = mock.Mock(status_code=status_code, text=str(body))
+    r.json.return_value = body
+    return r
+
+
+class FetchPostIdsTest(unittest.TestCase):
+    def setUp(self):
+        importer.POST_IDS.clear()
+
+    def test_batch_hit_and_fallback_for_canonicalized_slug(self):
+        # WP answers the batch with its canonical slug "etv" for "e.tv", so
+        # only "zee-tv" is recorded and "e.tv" goes to the single-slug query
+        session = mock.Mock()
+        session.get.side_effect = [
+            response(200, [{'id': 11, 'slug': 'zee-tv'}, {'id': 22, 'slug': 'etv'}]),
+            response(200, [{'id': 22, 'slug': 'etv'}]),
+        ]
+        with mock.patch.object(importer, 'SESSION', session):
+            importer.fetch_post_ids(['zee-tv', 'e.tv'])
+            self.assertEqual(importer.POST_IDS, {'zee-tv': 11})
+
+            with mock.patch.object(importer, 'update_acf_fields', return_value=True) as update, \
+                    mock.patch('builtins.open', mock.mock_open(read_data='{"date": "2025-11-02", "programs": [{"show_name": "News"}]}')):
+                importer.process_file('output-today/e.tv.json', is_today=True)
+
+        batch_params = session.get.call_args_list[0].kwargs['params']
+        self.assertEqual(batch_params['slug'], 'zee-tv,e.tv')
+        self.assertEqual(session.get.call_args_list[1].kwargs['params'], {'slug': 'e.tv'})
+        self.assertEqual(update.call_args.args[0], 22)
+
+    def test_failed_batch_records_nothing(self):
+        session = mock.Mock()
+        session.get.return_value = response(500, 'error')
+        with mock.patch.object(importer, 'SESSION', session):
+            importer.fetch_post_ids(['zee-tv'])
+        self.assertEqual(importer.POST_IDS, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
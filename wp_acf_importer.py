@@ -2,10 +2,13 @@ import os
 import json
 import base64
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from glob import glob
 from typing import List, Dict, Any, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 logger = logging.getLogger(__name__)
@@ -15,6 +18,10 @@ WP_BASE_URL = os.environ.get('WP_BASE_URL')
 WP_USER = os.environ.get('WP_USER')
 WP_APP_PASSWORD = os.environ.get('WP_APP_PASSWORD')
 POST_TYPE = os.environ.get('POST_TYPE', 'channel')
+# WP REST caps per_page at 100, so slug lookups are batched in groups of 100
+SLUG_BATCH_SIZE = 100
+# Files are imported concurrently; keep this modest to stay clear of WP rate limits
+IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', '8'))
 
 # Local repo directories (relative to repo root)
 TODAY_DIR = os.environ.get('TODAY_DIR', 'output-today')
@@ -31,6 +38,28 @@ def make_auth_header(user: str, app_password: str) -> Dict[str, str]:
 
 AUTH_HEADERS = make_auth_header(WP_USER, WP_APP_PASSWORD)
 
+# One session for every request so connections (and TLS) are kept alive
+# between files instead of reconnecting per call; the pool is sized for
+# the worker threads that share it. Connection errors and gateway errors are
+# retried with backoff; ACF updates overwrite the field, so POSTs are safe
+# to repeat.
+def make_session() -> requests.Session:
+    session = requests.Session()
+    session.headers.update(AUTH_HEADERS)
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({'GET', 'POST'}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=IMPORT_WORKERS, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+SESSION = make_session()
+
 # ---------- Helper functions ----------
 
 def slug_from_filename(path: str) -> str:
@@ -45,7 +74,7 @@ def get_post_id_by_slug(slug: str) -> Optional[int]:
     url = f"{WP_BASE_URL}/wp-json/wp/v2/{POST_TYPE}"
     params = {'slug': slug}
     logger.debug(f'Querying for slug {slug} at {url}')
-    r = requests.get(url, params=params, headers=AUTH_HEADERS)
+    r = SESSION.get(url, params=params)
     if r.status_code != 200:
         logger.warning(f'WP query returned {r.status_code} for slug {slug}: {r.text[:200]}')
         return None
@@ -58,6 +87,38 @@ def get_post_id_by_slug(slug: str) -> Optional[int]:
     return post_id
 
 
+# slug -> post id for posts found by fetch_post_ids
+POST_IDS: Dict[str, int] = {}
+
+
+def fetch_post_ids(slugs: List[str]) -> None:
+    """Look up post ids for many slugs at once, SLUG_BATCH_SIZE per request.
+
+    Found posts go into POST_IDS; slugs already known are not queried again.
+    WP sanitizes queried slugs and answers with the canonical slug, so a slug
+    it does not echo back exactly (or one from a failed batch) is left out
+    and process_file falls back to get_post_id_by_slug for it.
+    """
+    url = f"{WP_BASE_URL}/wp-json/wp/v2/{POST_TYPE}"
+    pending = [s for s in dict.fromkeys(slugs) if s not in POST_IDS]
+    for i in range(0, len(pending), SLUG_BATCH_SIZE):
+        batch = pending[i:i + SLUG_BATCH_SIZE]
+        params = {'slug': ','.join(batch), 'per_page': SLUG_BATCH_SIZE, '_fields': 'id,slug'}
+        r = SESSION.get(url, params=params)
+        if r.status_code != 200:
+            logger.warning(f'WP batch query returned {r.status_code} for {len(batch)} slugs: {r.text[:200]}')
+            continue
+        found = {}
+        for post in r.json():
+            found.setdefault(post.get('slug'), post.get('id'))
+        matched = 0
+        for slug in batch:
+            if found.get(slug):
+                POST_IDS[slug] = found[slug]
+                matched += 1
+        logger.info(f'Found {matched} of {len(batch)} posts in batch lookup')
+
+
 def update_acf_fields(post_id: int, fields_payload: Dict[str, Any]) -> bool:
     """Try update via ACF REST endpoint. Fallbacks included."""
     # Primary guess: endpoint for CPTs often exposed as /wp-json/acf/v3/{post_type}/{id}
@@ -66,11 +127,13 @@ def update_acf_fields(post_id: int, fields_payload: Dict[str, Any]) -> bool:
         f"{WP_BASE_URL}/wp-json/acf/v3/posts/{post_id}",
     ]
 
-    payload = {"fields": fields_payload}
+    # Serialize once, compactly and as raw UTF-8 (titles are often non-Latin),
+    # rather than the default spaced, \u-escaped form on every attempt
+    payload = json.dumps({"fields": fields_payload}, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
 
     for ep in endpoints:
         logger.debug(f'Trying ACF endpoint: {ep}')
-        r = requests.post(ep, headers=AUTH_HEADERS, data=json.dumps(payload))
+        r = SESSION.post(ep, data=payload)
         if r.status_code in (200, 201):
             logger.info(f'Successfully updated ACF for post {post_id} using {ep}')
             return True
@@ -99,46 +162,45 @@ def make_repeater_rows(programs: List[Dict[str, Any]], date_value: str) -> List[
 # ---------- Main processing ----------
 
 def process_file(path: str, is_today: bool = True) -> None:
-    logger.info("=" * 80)
-    logger.info(f"Processing file: {path} (today={is_today})")
+    # Files are imported concurrently, so every line carries the slug
+    # instead of relying on banners to group a file's output
+    slug = slug_from_filename(path)
+    logger.info(f"[{slug}] Processing file: {path} (today={is_today})")
     try:
         with open(path, "r", encoding="utf-8") as f:
             data = json.load(f)
     except Exception as e:
-        logger.error(f"Failed to load JSON {path}: {e}")
+        logger.error(f"[{slug}] Failed to load JSON {path}: {e}")
         return
 
-    slug = slug_from_filename(path)
-    post_id = get_post_id_by_slug(slug)
+    post_id = POST_IDS.get(slug) or get_post_id_by_slug(slug)
     if not post_id:
-        logger.error(f"❌ Cannot find post for slug {slug}. Skipping.")
+        logger.error(f"[{slug}] ❌ Cannot find post for slug {slug}. Skipping.")
         return
 
     date_value = data.get("date") or ""
     programs = data.get("programs") or []
 
     if not programs:
-        logger.warning(f"⚠️ No 'programs' found in {path}. Skipping ACF update.")
+        logger.warning(f"[{slug}] ⚠️ No 'programs' found in {path}. Skipping ACF update.")
         return
 
     # Build repeater rows
     repeater_rows = make_repeater_rows(programs, date_value)
     first_show = programs[0].get("show_name", "N/A") if programs else "N/A"
-    logger.info(f"Found {len(repeater_rows)} programs for {slug} ({date_value}) — example: {first_show}")
+    logger.info(f"[{slug}] Found {len(repeater_rows)} programs ({date_value}) — example: {first_show}")
 
     fields_payload = {}
     field_name = "schedule_repeater" if is_today else "schedule_tomorrow"
     fields_payload[field_name] = repeater_rows
 
-    logger.info(f"➡️ Uploading {len(repeater_rows)} rows to field '{field_name}' for post {post_id}")
+    logger.info(f"[{slug}] ➡️ Uploading {len(repeater_rows)} rows to field '{field_name}' for post {post_id}")
     success = update_acf_fields(post_id, fields_payload)
 
     if success:
-        logger.info(f"✅ Successfully updated ACF for post {post_id} ({slug})")
+        logger.info(f"[{slug}] ✅ Successfully updated ACF for post {post_id}")
     else:
-        logger.error(f"❌ Failed to update ACF for post {post_id} ({slug})")
-
-    logger.info("=" * 80)
+        logger.error(f"[{slug}] ❌ Failed to update ACF for post {post_id}")
 
 def process_directory(directory: str, is_today: bool) -> None:
     if not os.path.isdir(directory):
@@ -146,8 +208,11 @@ def process_directory(directory: str, is_today: bool) -> None:
         return
     files = sorted(glob(os.path.join(directory, '*.json')))
     logger.info(f'Found {len(files)} json files in {directory}')
-    for f in files:
-        process_file(f, is_today=is_today)
+    fetch_post_ids([slug_from_filename(f) for f in files])
+    # Each file is independent and the time goes on WP round-trips, so run
+    # several at once over the shared session
+    with ThreadPoolExecutor(max_workers=IMPORT_WORKERS) as executor:
+        list(executor.map(lambda f: process_file(f, is_today=is_today), files))
 
 
 if __name__ == '__main__':